@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def warm_up(self):
+        if settings.WARM_UP_WORKERS:
+            from .services.warmup import warm_up_caches, warm_up_clients
+            warm_up_clients()
+            warm_up_caches()
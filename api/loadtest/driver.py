@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+def read_trips(log_path):
+    trips = []
+    with open(log_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+                trips.append({
+                    'start_location': entry['start_location'],
+                    'end_location': entry['end_location'],
+                })
+            except (ValueError, KeyError, TypeError):
+                continue
+    return trips
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class ProcessMonitor:
+    CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+    
+    def __init__(self, pids):
+        self.pids = list(pids)
+    
+    def cpu_seconds(self):
+        return self._total(self._cpu_seconds)
+    
+    def rss_mb(self):
+        return self._total(self._rss_mb)
+    
+    def _total(self, sample):
+        # Sum over every server process (e.g. all gunicorn workers), skipping
+        # ones that have exited.
+        values = [value for value in map(sample, self.pids) if value is not None]
+        return sum(values) if values else None
+    
+    def _cpu_seconds(self, pid):
+        try:
+            with open(f'/proc/{pid}/stat', 'r') as file:
+                fields = file.read().rsplit(')', 1)[1].split()
+        except OSError:
+            return None
+        # utime and stime are fields 14 and 15 of /proc/<pid>/stat.
+        return (int(fields[11]) + int(fields[12])) / self.CLOCK_TICKS
+    
+    def _rss_mb(self, pid):
+        try:
+            with open(f'/proc/{pid}/status', 'r') as file:
+                for line in file:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return None
+
+
+class LoadDriver:
+
+    def __init__(self, url, trips, timeout=60, monitor=None):
+        self.url = url
+        self.trips = trips
+        self.timeout = timeout
+        self.monitor = monitor
+        self.session = None
+        self._lock = threading.Lock()
+        self._next_trip = 0
+    
+    def run_step(self, concurrency, rps, duration):
+        results = []
+        cpu_before = self.monitor.cpu_seconds() if self.monitor else None
+        self.session = self._create_session(concurrency)
+        
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                if rps > 0:
+                    futures = []
+                    for k in range(int(rps * duration)):
+                        scheduled = started + k / rps
+                        delay = scheduled - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                        futures.append(executor.submit(self._send, scheduled))
+                    wait(futures)
+                    results = [future.result() for future in futures]
+                else:
+                    deadline = started + duration
+                    futures = [executor.submit(self._send_until, deadline) for _ in range(concurrency)]
+                    wait(futures)
+                    for future in futures:
+                        results.extend(future.result())
+            elapsed = time.perf_counter() - started
+        finally:
+            # Drop this step's keep-alive connections so they don't linger on the
+            # server while later steps are measured.
+            self.session.close()
+            self.session = None
+        
+        return self._summarize(concurrency, rps, elapsed, results, cpu_before)
+    
+    def _create_session(self, concurrency):
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def _send_until(self, deadline):
+        results = []
+        while time.perf_counter() < deadline:
+            results.append(self._send(time.perf_counter()))
+        return results
+    
+    def _send(self, scheduled):
+        trip = self._take_trip()
+        try:
+            response = self.session.post(self.url, json=trip, timeout=self.timeout)
+            ok = response.status_code == 200
+            cache_hit = ok and response.json().get('performance', {}).get('cache_hit', False)
+        except Exception:
+            ok, cache_hit = False, False
+        return time.perf_counter() - scheduled, ok, cache_hit
+    
+    def _take_trip(self):
+        with self._lock:
+            trip = self.trips[self._next_trip % len(self.trips)]
+            self._next_trip += 1
+        return trip
+    
+    def _summarize(self, concurrency, rps, elapsed, results, cpu_before):
+        latencies = sorted(latency for latency, ok, _ in results if ok)
+        errors = sum(1 for _, ok, _ in results if not ok)
+        cache_hits = sum(1 for _, ok, cache_hit in results if ok and cache_hit)
+        
+        summary = {
+            'concurrency': concurrency,
+            'target_rps': rps,
+            'requests': len(results),
+            'throughput_rps': len(latencies) / elapsed if elapsed > 0 else 0.0,
+            'error_rate': errors / len(results) if results else 0.0,
+            'cache_hit_rate': cache_hits / len(latencies) if latencies else 0.0,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p90_ms': percentile(latencies, 0.90) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+            'cpu_percent': None,
+            'rss_mb': None,
+        }
+        
+        if self.monitor:
+            cpu_after = self.monitor.cpu_seconds()
+            if cpu_before is not None and cpu_after is not None and elapsed > 0:
+                summary['cpu_percent'] = (cpu_after - cpu_before) / elapsed * 100
+            summary['rss_mb'] = self.monitor.rss_mb()
+        
+        return summary
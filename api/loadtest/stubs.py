@@ -0,0 +1,149 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from api.services.route_model import haversine_miles
+
+
+OSRM_PATH_PREFIX = '/route/v1/driving/'
+NOMINATIM_PATH = '/search'
+ROAD_FACTOR = 1.2
+AVERAGE_SPEED_MPH = 60
+
+
+class StubConfig:
+
+    def __init__(self, recordings=None, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=None):
+        recordings = recordings or {}
+        self.osrm_recordings = recordings.get('osrm', {})
+        self.nominatim_recordings = {
+            key.lower(): value for key, value in recordings.get('nominatim', {}).items()
+        }
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {'osrm': 0, 'nominatim': 0, 'errors': 0}
+    
+    def next_delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(self.latency_ms + jitter, 0) / 1000
+    
+    def should_fail(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+    
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        config = self.server.stub_config
+        parsed = urlsplit(self.path)
+        
+        if parsed.path.startswith(OSRM_PATH_PREFIX):
+            name, handler = 'osrm', self._osrm_response
+        elif parsed.path == NOMINATIM_PATH:
+            name, handler = 'nominatim', self._nominatim_response
+        else:
+            self._send_json(404, {'error': f'Unknown stub path: {parsed.path}'})
+            return
+        
+        config.count(name)
+        time.sleep(config.next_delay())
+        
+        if config.should_fail():
+            config.count('errors')
+            self._send_json(503, {'error': 'Injected stub failure'})
+            return
+        
+        try:
+            payload = handler(parsed)
+        except ValueError as e:
+            self._send_json(400, {'code': 'InvalidQuery', 'message': str(e)})
+            return
+        
+        self._send_json(200, payload)
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _osrm_response(self, parsed):
+        coordinates = unquote(parsed.path[len(OSRM_PATH_PREFIX):])
+        recorded = self.server.stub_config.osrm_recordings.get(coordinates)
+        if recorded is not None:
+            return recorded
+        
+        (start_lng, start_lat), (end_lng, end_lat) = [
+            map(float, point.split(',')) for point in coordinates.split(';')[:2]
+        ]
+        return synthesize_route(start_lat, start_lng, end_lat, end_lng)
+    
+    def _nominatim_response(self, parsed):
+        query = parse_qs(parsed.query).get('q', [''])[0]
+        recorded = self.server.stub_config.nominatim_recordings.get(query.lower())
+        if recorded is not None:
+            return recorded
+        
+        lat, lng = synthesize_location(query)
+        return [{
+            'lat': str(lat),
+            'lon': str(lng),
+            'display_name': query,
+            'place_id': int(hashlib.sha1(query.encode('utf-8')).hexdigest()[:8], 16),
+        }]
+    
+    def _send_json(self, status_code, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def synthesize_location(query):
+    digest = hashlib.sha1(query.lower().encode('utf-8')).digest()
+    lat = 30 + 17 * digest[0] / 255
+    lng = -120 + 45 * digest[1] / 255
+    return round(lat, 6), round(lng, 6)
+
+
+def synthesize_route(start_lat, start_lng, end_lat, end_lng):
+    import polyline
+    
+    straight_miles = float(haversine_miles(start_lat, start_lng, end_lat, end_lng))
+    points = max(int(straight_miles), 2)
+    coords = [
+        (
+            start_lat + (end_lat - start_lat) * i / (points - 1),
+            start_lng + (end_lng - start_lng) * i / (points - 1)
+        )
+        for i in range(points)
+    ]
+    road_miles = straight_miles * ROAD_FACTOR
+    
+    return {
+        'code': 'Ok',
+        'routes': [{
+            'geometry': polyline.encode(coords),
+            'distance': road_miles / 0.000621371,
+            'duration': road_miles / AVERAGE_SPEED_MPH * 3600,
+        }],
+    }
+
+
+def create_stub_server(host, port, stub_config):
+    server = ThreadingHTTPServer((host, port), StubRequestHandler)
+    server.daemon_threads = True
+    server.stub_config = stub_config
+    return server
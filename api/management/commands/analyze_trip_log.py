@@ -0,0 +1,248 @@
+import csv
+import json
+import multiprocessing
+import os
+import time
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Avg
+
+
+OUTPUT_COLUMNS = [
+    'line_number',
+    'start_location',
+    'end_location',
+    'distance_miles',
+    'fuel_stops',
+    'total_gallons',
+    'total_fuel_cost',
+    'naive_fuel_cost',
+    'savings',
+    'error',
+]
+
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 2
+
+_worker_state = {}
+
+
+# Spawn and forkserver workers import this module before django.setup() has run,
+# so anything that touches the app registry is imported inside the functions.
+def _init_pool_worker(geocode_lock, last_geocode):
+    import django
+    django.setup()
+    connections.close_all()
+    
+    from api.services.clients import geocode_rate_limit
+    geocode_rate_limit.share(geocode_lock, last_geocode)
+    _init_worker()
+
+
+def _init_worker():
+    from api.services.fuel_optimizer import FuelOptimizer
+    from api.services.osrm_route_service import OSRMRouteService
+    
+    _worker_state['route_service'] = OSRMRouteService()
+    _worker_state['optimizer'] = FuelOptimizer()
+    _worker_state['average_price'] = _average_price()
+
+
+def _average_price():
+    from api.models import FuelStation
+    
+    average = FuelStation.objects.aggregate(avg=Avg('retail_price'))['avg']
+    return float(average) if average is not None else 0.0
+
+
+def _is_transient(error):
+    import requests
+    from geopy.exc import GeocoderRateLimited, GeocoderServiceError, GeocoderTimedOut, GeocoderUnavailable
+    
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError):
+        status_code = error.response.status_code if error.response is not None else 0
+        return status_code == 429 or status_code >= 500
+    if isinstance(error, (GeocoderRateLimited, GeocoderTimedOut, GeocoderUnavailable)):
+        return True
+    # geopy raises the bare base class for unmapped status codes such as 500.
+    return type(error) is GeocoderServiceError
+
+
+def _plan_trip(task):
+    line_number, start_location, end_location = task
+    row = {
+        'line_number': line_number,
+        'start_location': start_location,
+        'end_location': end_location,
+    }
+    
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            route_data = _worker_state['route_service'].get_route(start_location, end_location)
+            fuel_stops = _worker_state['optimizer'].optimize_fuel_stops(
+                route_data['coordinates'],
+                route_data['distance_miles']
+            )
+            break
+        except Exception as e:
+            row['error'] = str(e)
+            if not _is_transient(e):
+                return row, False
+            if attempt == RETRY_ATTEMPTS - 1:
+                return row, True
+            time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+    
+    totals = _worker_state['optimizer'].trip_totals(fuel_stops)
+    total_fuel_cost = totals['total_fuel_cost']
+    total_gallons = totals['total_gallons']
+    naive_fuel_cost = total_gallons * _worker_state['average_price']
+    
+    row.update({
+        'distance_miles': round(route_data['distance_miles'], 2),
+        'fuel_stops': len(fuel_stops),
+        'total_gallons': round(total_gallons, 2),
+        'total_fuel_cost': round(total_fuel_cost, 2),
+        'naive_fuel_cost': round(naive_fuel_cost, 2),
+        'savings': round(naive_fuel_cost - total_fuel_cost, 2),
+        'error': '',
+    })
+    return row, False
+
+
+class Command(BaseCommand):
+    help = 'Compute fuel plans for every trip in a JSONL request log and write them to CSV'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('log_path', help='JSONL file with start_location/end_location per line')
+        parser.add_argument('--output', required=True, help='CSV file to write results to')
+        parser.add_argument('--checkpoint', help='Checkpoint file (defaults to <output>.checkpoint)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        log_path = options['log_path']
+        output_path = options['output']
+        checkpoint_path = options['checkpoint'] or f"{output_path}.checkpoint"
+        workers = max(options['workers'], 1)
+        batch_size = max(options['batch_size'], 1)
+        
+        if not os.path.exists(log_path):
+            raise CommandError(f'Log file not found: {log_path}')
+        
+        processed, output_offset = self._load_checkpoint(checkpoint_path, log_path)
+        resuming = processed > 0 and os.path.exists(output_path)
+        if resuming:
+            self.stdout.write(f'Resuming after line {processed}...')
+            with open(output_path, 'r+b') as output_file:
+                output_file.truncate(output_offset)
+        else:
+            processed = 0
+        
+        if workers > 1:
+            context = multiprocessing.get_context()
+            pool = context.Pool(
+                workers,
+                initializer=_init_pool_worker,
+                initargs=(context.Lock(), context.Value('d', 0.0, lock=False))
+            )
+        else:
+            pool = None
+            _init_worker()
+        
+        failed = None
+        try:
+            with open(log_path, 'r', encoding='utf-8') as log_file, \
+                    open(output_path, 'a' if resuming else 'w', newline='', encoding='utf-8') as output_file:
+                writer = csv.DictWriter(output_file, fieldnames=OUTPUT_COLUMNS)
+                if not resuming:
+                    writer.writeheader()
+                
+                lines = enumerate(log_file, start=1)
+                for _ in islice(lines, processed):
+                    pass
+                
+                while True:
+                    batch = list(islice(lines, batch_size))
+                    if not batch:
+                        break
+                    
+                    tasks = []
+                    for line_number, line in batch:
+                        task = self._parse_line(line_number, line)
+                        if task:
+                            tasks.append(task)
+                    
+                    if pool is not None:
+                        results = pool.imap(_plan_trip, tasks, chunksize=max(len(tasks) // (workers * 4), 1))
+                    else:
+                        results = map(_plan_trip, tasks)
+                    
+                    for row, transient in results:
+                        if transient:
+                            failed = row
+                            break
+                        writer.writerow(row)
+                    output_file.flush()
+                    
+                    # Stop before a trip that kept failing upstream so a rerun retries it.
+                    processed = failed['line_number'] - 1 if failed else batch[-1][0]
+                    self._save_checkpoint(checkpoint_path, log_path, processed, output_file.tell())
+                    self.stdout.write(f'Processed {processed} lines')
+                    if failed:
+                        break
+        finally:
+            # Every submitted task has been consumed unless we stopped early, so
+            # terminating never discards finished work.
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        
+        if failed:
+            raise CommandError(
+                f"Upstream failure at line {failed['line_number']} ({failed['error']}); "
+                f"rerun the same command to resume from there"
+            )
+        
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        
+        self.stdout.write(self.style.SUCCESS(f'Wrote fuel plans for {processed} lines to {output_path}'))
+    
+    def _parse_line(self, line_number, line):
+        line = line.strip()
+        if not line:
+            return None
+        
+        try:
+            entry = json.loads(line)
+            start_location = entry['start_location']
+            end_location = entry['end_location']
+        except (ValueError, KeyError, TypeError):
+            self.stderr.write(f'Skipping line {line_number}: missing start_location/end_location')
+            return None
+        
+        return (line_number, start_location, end_location)
+    
+    def _load_checkpoint(self, checkpoint_path, log_path):
+        if not os.path.exists(checkpoint_path):
+            return 0, 0
+        
+        with open(checkpoint_path, 'r', encoding='utf-8') as file:
+            checkpoint = json.load(file)
+        
+        if checkpoint.get('log_path') != os.path.abspath(log_path):
+            raise CommandError(f'Checkpoint {checkpoint_path} belongs to a different log file')
+        return checkpoint.get('processed', 0), checkpoint.get('output_offset', 0)
+    
+    def _save_checkpoint(self, checkpoint_path, log_path, processed, output_offset):
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'log_path': os.path.abspath(log_path),
+                'processed': processed,
+                'output_offset': output_offset,
+            }, file)
+        os.replace(tmp_path, checkpoint_path)
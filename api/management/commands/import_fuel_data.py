@@ -1,7 +1,8 @@
 import csv
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from api.models import FuelStation
+from django.db import transaction
+from api.models import FuelStation, FuelDataVersion
 
 
 class Command(BaseCommand):
@@ -10,9 +11,6 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         csv_path = settings.BASE_DIR / 'data' / 'fuel-prices-for-be-assessment.csv'
         
-        self.stdout.write('Clearing existing data...')
-        FuelStation.objects.all().delete()
-        
         self.stdout.write('Loading CSV data...')
         stations_data = {}
         
@@ -39,8 +37,19 @@ class Command(BaseCommand):
                         'retail_price': price,
                     }
         
-        self.stdout.write(f'Creating {len(stations_data)} unique stations...')
         stations = [FuelStation(**data) for data in stations_data.values()]
-        FuelStation.objects.bulk_create(stations, batch_size=500)
+        
+        # Swap the station table and bump the price version together, so no reader
+        # (and no cached response) ever sees an empty or partial station set.
+        with transaction.atomic():
+            self.stdout.write('Clearing existing data...')
+            FuelStation.objects.all().delete()
+            
+            self.stdout.write(f'Creating {len(stations)} unique stations...')
+            FuelStation.objects.bulk_create(stations, batch_size=500)
+            
+            version = FuelDataVersion.bump()
+        
+        self.stdout.write(f'Fuel data version is now {version}')
         
         self.stdout.write(self.style.SUCCESS(f'Successfully imported {len(stations)} fuel stations'))
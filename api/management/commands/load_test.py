@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.loadtest.driver import LoadDriver, ProcessMonitor, read_trips
+
+
+class Command(BaseCommand):
+    help = 'Replay a JSONL trip log against the route optimizer while ramping concurrency'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('log_path', help='JSONL file with start_location/end_location per line')
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/route-optimizer/')
+        parser.add_argument('--concurrency', default='1,2,4,8,16', help='Comma-separated concurrency steps')
+        parser.add_argument('--rps', type=float, default=0, help='Target requests per second (0 = as fast as possible)')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds per concurrency step')
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument(
+            '--pid', type=int, nargs='+', action='extend', default=[],
+            help='Server process(es) to sample CPU and memory from; values are summed across processes'
+        )
+    
+    def handle(self, *args, **options):
+        try:
+            steps = [int(step) for step in options['concurrency'].split(',') if step.strip()]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma-separated list of integers')
+        if not steps or min(steps) < 1:
+            raise CommandError('--concurrency steps must be positive')
+        
+        try:
+            trips = read_trips(options['log_path'])
+        except OSError as e:
+            raise CommandError(f'Could not read trip log: {e}')
+        if not trips:
+            raise CommandError('Trip log contains no start_location/end_location entries')
+        
+        monitor = ProcessMonitor(options['pid']) if options['pid'] else None
+        driver = LoadDriver(options['url'], trips, timeout=options['timeout'], monitor=monitor)
+        
+        self.stdout.write(
+            f"{'conc':>5} {'reqs':>7} {'rps':>8} {'err%':>6} {'hit%':>6} "
+            f"{'p50ms':>8} {'p90ms':>8} {'p99ms':>8} {'maxms':>8} {'cpu%':>6} {'rssMB':>7}"
+        )
+        
+        for concurrency in steps:
+            summary = driver.run_step(concurrency, options['rps'], options['duration'])
+            self.stdout.write(self._format_row(summary))
+    
+    def _format_row(self, summary):
+        cpu = f"{summary['cpu_percent']:.0f}" if summary['cpu_percent'] is not None else '-'
+        rss = f"{summary['rss_mb']:.0f}" if summary['rss_mb'] is not None else '-'
+        return (
+            f"{summary['concurrency']:>5} {summary['requests']:>7} {summary['throughput_rps']:>8.2f} "
+            f"{summary['error_rate'] * 100:>6.1f} {summary['cache_hit_rate'] * 100:>6.1f} "
+            f"{summary['p50_ms']:>8.0f} {summary['p90_ms']:>8.0f} {summary['p99_ms']:>8.0f} "
+            f"{summary['max_ms']:>8.0f} {cpu:>6} {rss:>7}"
+        )
@@ -0,0 +1,53 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api.loadtest.stubs import StubConfig, create_stub_server
+
+
+class Command(BaseCommand):
+    help = 'Serve local OSRM and Nominatim stubs for offline load testing'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8081)
+        parser.add_argument('--recordings', help='JSON file with recorded "osrm" and "nominatim" responses')
+        parser.add_argument('--latency-ms', type=float, default=0, help='Mean added latency per response')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Uniform jitter around the mean latency')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of responses answered with 503')
+        parser.add_argument('--seed', type=int)
+    
+    def handle(self, *args, **options):
+        recordings = {}
+        if options['recordings']:
+            try:
+                with open(options['recordings'], 'r', encoding='utf-8') as file:
+                    recordings = json.load(file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not load recordings: {e}")
+        
+        stub_config = StubConfig(
+            recordings=recordings,
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            seed=options['seed']
+        )
+        server = create_stub_server(options['host'], options['port'], stub_config)
+        address = f"{options['host']}:{options['port']}"
+        
+        self.stdout.write(f'Stubs listening on http://{address}')
+        self.stdout.write('Point the API at them with:')
+        self.stdout.write(f'  OSRM_BASE_URL=http://{address}/route/v1/driving')
+        self.stdout.write(f'  NOMINATIM_DOMAIN={address} NOMINATIM_SCHEME=http')
+        
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        
+        counts = stub_config.counts
+        self.stdout.write(self.style.SUCCESS(
+            f"Served {counts['osrm']} OSRM and {counts['nominatim']} Nominatim requests "
+            f"({counts['errors']} injected errors)"
+        ))
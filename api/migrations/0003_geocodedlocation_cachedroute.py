@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_fueldataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodedLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=255, unique=True)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CachedRoute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_query', models.CharField(max_length=255)),
+                ('end_query', models.CharField(max_length=255)),
+                ('polyline', models.TextField()),
+                ('distance_miles', models.FloatField()),
+                ('duration_hours', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('start_query', 'end_query'), name='unique_cached_route')],
+            },
+        ),
+    ]
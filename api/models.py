@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class FuelStation(models.Model):
@@ -25,3 +26,52 @@ class FuelStation(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.city}, {self.state}"
+
+
+class GeocodedLocation(models.Model):
+    query = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.query} ({self.latitude}, {self.longitude})"
+
+
+class CachedRoute(models.Model):
+    start_query = models.CharField(max_length=255)
+    end_query = models.CharField(max_length=255)
+    polyline = models.TextField()
+    distance_miles = models.FloatField()
+    duration_hours = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['start_query', 'end_query'], name='unique_cached_route'),
+        ]
+
+    def __str__(self):
+        return f"{self.start_query} -> {self.end_query}"
+
+
+class FuelDataVersion(models.Model):
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def current(cls):
+        version = cls.objects.filter(pk=1).values_list('version', flat=True).first()
+        return version or 0
+
+    @classmethod
+    def bump(cls):
+        cls.objects.get_or_create(pk=1)
+        cls.objects.filter(pk=1).update(
+            version=models.F('version') + 1,
+            updated_at=timezone.now()
+        )
+        return cls.current()
+
+    def __str__(self):
+        return f"Fuel data v{self.version}"
@@ -0,0 +1,77 @@
+import threading
+import time
+from functools import lru_cache
+from decouple import config
+from django.conf import settings
+
+
+USER_AGENT = "fuel_optimizer"
+
+
+class RateLimiter:
+    
+    def __init__(self, interval_seconds):
+        self.interval_seconds = interval_seconds
+        self.lock = threading.Lock()
+        self.last_call = None
+        self._last_call = 0.0
+    
+    def share(self, lock, last_call):
+        # Swap in a multiprocessing lock and shared double so every process in a
+        # pool spaces its calls against the same clock.
+        self.lock = lock
+        self.last_call = last_call
+    
+    def __enter__(self):
+        self.lock.acquire()
+        last_call = self.last_call.value if self.last_call is not None else self._last_call
+        delay = last_call + self.interval_seconds - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        return self
+    
+    def __exit__(self, *exc_info):
+        if self.last_call is not None:
+            self.last_call.value = time.time()
+        else:
+            self._last_call = time.time()
+        self.lock.release()
+
+
+geocode_rate_limit = RateLimiter(config('NOMINATIM_MIN_INTERVAL', default=1.1, cast=float))
+
+
+@lru_cache(maxsize=None)
+def get_geolocator():
+    from geopy.geocoders import Nominatim
+    return Nominatim(
+        user_agent=USER_AGENT,
+        timeout=15,
+        domain=config('NOMINATIM_DOMAIN', default='nominatim.openstreetmap.org'),
+        scheme=config('NOMINATIM_SCHEME', default='https')
+    )
+
+
+def geocode(query, timeout=15):
+    with geocode_rate_limit:
+        return get_geolocator().geocode(query, timeout=timeout)
+
+
+def get_http_session():
+    if not settings.HTTP_POOLING_ENABLED:
+        # requests.get() opens and closes its own session on every call.
+        import requests
+        return requests
+    return _get_pooled_session()
+
+
+@lru_cache(maxsize=None)
+def _get_pooled_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
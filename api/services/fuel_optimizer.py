@@ -1,70 +1,152 @@
 import math
-import time
 from api.models import FuelStation
-from geopy.geocoders import Nominatim
+from .geocoding import geocode_location
+
+
+class NoReachableStationError(ValueError):
+    pass
 
 
 class FuelOptimizer:
     MAX_RANGE_MILES = 500
     MPG = 10
     BUFFER_MILES = 50
+    LOCATE_PADDING_MILES = 100
+    
+    geocoded_cities = {}
+    
+    @classmethod
+    def load_geocoded_cities(cls):
+        rows = FuelStation.objects.filter(geocoded=True).values_list(
+            'city', 'state', 'latitude', 'longitude'
+        ).distinct()
+        
+        for city, state, lat, lng in rows:
+            cls.geocoded_cities[f"{city}, {state}"] = (lat, lng)
+        
+        return len(cls.geocoded_cities)
     
-    def __init__(self):
-        self.geolocator = Nominatim(user_agent="fuel_optimizer_app")
-        self.geocoded_cities = {}
+    @classmethod
+    def vehicle_params(cls):
+        return {
+            'max_range_miles': cls.MAX_RANGE_MILES,
+            'mpg': cls.MPG,
+            'buffer_miles': cls.BUFFER_MILES
+        }
     
     def optimize_fuel_stops(self, route_coords, distance_miles):
-        num_stops = math.ceil(distance_miles / (self.MAX_RANGE_MILES - self.BUFFER_MILES))
+        from .route_model import RouteModel
         
-        if num_stops == 0:
-            num_stops = 1
+        if distance_miles <= 0:
+            return []
         
-        segment_distance = distance_miles / num_stops
-        fuel_stops = []
+        usable_range = self.MAX_RANGE_MILES - self.BUFFER_MILES
+        stops_left = max(math.ceil(distance_miles / usable_range), 1)
+        route = RouteModel(route_coords, distance_miles)
+        planned_stops = []
         used_station_ids = set()
         used_station_keys = set()
-        
-        for i in range(num_stops):
-            target_distance = (i + 1) * segment_distance
-            progress = target_distance / distance_miles
-            coord_index = int(progress * (len(route_coords) - 1))
-            target_coord = route_coords[min(coord_index, len(route_coords) - 1)]
-            
-            station = self._find_cheapest_station_near(target_coord, route_coords, used_station_ids)
+        previous_miles = 0.0
+        
+        # Plan each leg from the stop actually chosen, only accepting stations that
+        # are reachable from it, until the destination is within range.
+        while stops_left > 0 or distance_miles - previous_miles > usable_range:
+            remaining_miles = distance_miles - previous_miles
+            legs = max(stops_left, math.ceil(remaining_miles / usable_range))
+            target_distance = previous_miles + remaining_miles / legs
+            window = (previous_miles, min(previous_miles + usable_range, distance_miles))
+            
+            station = None
+            for center_miles in (target_distance, sum(window) / 2):
+                target_coord = route.coordinate_at(center_miles)
+                station = self._find_cheapest_station_near(target_coord, route, window, used_station_ids)
+                
+                if not station:
+                    station = self._find_any_station_near(target_coord, used_station_ids, route, window)
+                
+                if station:
+                    break
             
             if not station:
-                station = self._find_any_station_near(target_coord, used_station_ids, route_coords)
+                raise NoReachableStationError(
+                    f"No fuel station within range between mile {window[0]:.0f} and mile {window[1]:.0f}"
+                )
             
-            if station:
-                station_key = (station.opis_truckstop_id, station.city.strip(), station.state)
-                if station_key in used_station_keys:
-                    continue
-                
-                used_station_ids.add(station.id)
-                used_station_keys.add(station_key)
-                gallons_needed = segment_distance / self.MPG
-                fuel_cost = float(station.retail_price) * gallons_needed
-                
-                fuel_stops.append({
-                    'stop_number': i + 1,
-                    'opis_truckstop_id': station.opis_truckstop_id,
-                    'station_name': station.name,
-                    'address': station.address,
-                    'city': station.city,
-                    'state': station.state,
-                    'coordinates': {
-                        'lat': station.latitude,
-                        'lng': station.longitude
-                    },
-                    'distance_from_start_miles': round(target_distance, 2),
-                    'fuel_price_per_gallon': float(station.retail_price),
-                    'gallons_needed': round(gallons_needed, 2),
-                    'fuel_cost': round(fuel_cost, 2)
-                })
+            used_station_ids.add(station.id)
+            station_key = (station.opis_truckstop_id, station.city.strip(), station.state)
+            if station_key in used_station_keys:
+                continue
+            
+            used_station_keys.add(station_key)
+            station_miles, _ = self._locate_in_window(route, station, window)
+            planned_stops.append((station_miles, station))
+            previous_miles = station_miles
+            stops_left -= 1
+        
+        fuel_stops = []
+        
+        # Each stop buys exactly what reaches the next stop or the destination. Legs
+        # never exceed the usable range, so a purchase always fits in the tank.
+        for index, (station_miles, station) in enumerate(planned_stops):
+            if index + 1 < len(planned_stops):
+                next_miles = planned_stops[index + 1][0]
+            else:
+                next_miles = distance_miles
+            
+            gallons_needed = (next_miles - station_miles) / self.MPG
+            fuel_cost = float(station.retail_price) * gallons_needed
+            
+            fuel_stops.append({
+                'stop_number': index + 1,
+                'opis_truckstop_id': station.opis_truckstop_id,
+                'station_name': station.name,
+                'address': station.address,
+                'city': station.city,
+                'state': station.state,
+                'coordinates': {
+                    'lat': station.latitude,
+                    'lng': station.longitude
+                },
+                'distance_from_start_miles': round(station_miles, 2),
+                'fuel_price_per_gallon': float(station.retail_price),
+                'gallons_needed': round(gallons_needed, 2),
+                'fuel_cost': round(fuel_cost, 2)
+            })
         
         return fuel_stops
     
-    def _find_cheapest_station_near(self, target_coord, route_coords, used_stations=None):
+    def trip_totals(self, fuel_stops):
+        if not fuel_stops:
+            return {'starting_tank_gallons': 0.0, 'total_gallons': 0.0, 'total_fuel_cost': 0.0}
+        
+        # The leg to the first stop runs on the starting tank; price it like that
+        # stop so the totals cover the whole trip.
+        first_stop = fuel_stops[0]
+        starting_tank_gallons = first_stop['distance_from_start_miles'] / self.MPG
+        total_gallons = starting_tank_gallons + sum(stop['gallons_needed'] for stop in fuel_stops)
+        total_fuel_cost = starting_tank_gallons * first_stop['fuel_price_per_gallon'] + sum(
+            stop['fuel_cost'] for stop in fuel_stops
+        )
+        
+        return {
+            'starting_tank_gallons': starting_tank_gallons,
+            'total_gallons': total_gallons,
+            'total_fuel_cost': total_fuel_cost
+        }
+    
+    def _locate_in_window(self, route, station, window):
+        # Pad the searched stretch so stations just outside the window still project
+        # to their true position and get rejected, instead of snapping to its edge.
+        return route.locate_station(
+            station,
+            window[0] - self.LOCATE_PADDING_MILES,
+            window[1] + self.LOCATE_PADDING_MILES
+        )
+    
+    def _in_window(self, station_miles, window):
+        return window[0] < station_miles <= window[1]
+    
+    def _find_cheapest_station_near(self, target_coord, route, window, used_stations=None):
         if used_stations is None:
             used_stations = set()
         
@@ -90,8 +172,8 @@ class FuelOptimizer:
             
             stations_with_distance = []
             for station in geocoded_stations:
-                min_dist = self._min_distance_to_route(station, route_coords)
-                if min_dist < 50:
+                station_miles, min_dist = self._locate_in_window(route, station, window)
+                if min_dist < 50 and self._in_window(station_miles, window):
                     stations_with_distance.append((station, min_dist))
             
             if stations_with_distance:
@@ -113,26 +195,27 @@ class FuelOptimizer:
                 lat, lng = self.geocoded_cities[city_key]
             else:
                 try:
-                    location = self.geolocator.geocode(f"{city}, {state}, USA", timeout=10)
-                    if location:
-                        lat, lng = location.latitude, location.longitude
-                        self.geocoded_cities[city_key] = (lat, lng)
-                        
-                        FuelStation.objects.filter(
-                            city=city, 
-                            state=state, 
-                            geocoded=False
-                        ).update(
-                            latitude=lat,
-                            longitude=lng,
-                            geocoded=True
-                        )
-                        
-                        time.sleep(1.1)
+                    coords = geocode_location(f"{city}, {state}, USA")
                 except:
-                    pass
+                    continue
+                
+                if not coords:
+                    continue
+                
+                lat, lng = coords
+                self.geocoded_cities[city_key] = (lat, lng)
+            
+            FuelStation.objects.filter(
+                city=city, 
+                state=state, 
+                geocoded=False
+            ).update(
+                latitude=lat,
+                longitude=lng,
+                geocoded=True
+            )
     
-    def _find_any_station_near(self, target_coord, used_stations, route_coords):
+    def _find_any_station_near(self, target_coord, used_stations, route, window):
         lat, lng = target_coord
         
         for search_radius in [1.0, 2.0, 3.0, 5.0]:
@@ -154,36 +237,8 @@ class FuelOptimizer:
             geocoded_stations = [s for s in stations if s.geocoded]
             
             for station in geocoded_stations:
-                dist = self._min_distance_to_route(station, route_coords)
-                if dist < 100:
+                station_miles, dist = self._locate_in_window(route, station, window)
+                if dist < 100 and self._in_window(station_miles, window):
                     return station
         
         return None
-    
-    def _min_distance_to_route(self, station, route_coords):
-        min_distance = float('inf')
-        
-        for coord in route_coords[::3]:
-            distance = self._haversine_distance(
-                station.latitude, station.longitude,
-                coord[0], coord[1]
-            )
-            min_distance = min(min_distance, distance)
-            
-            if min_distance < 3:
-                return min_distance
-        
-        return min_distance
-    
-    def _haversine_distance(self, lat1, lon1, lat2, lon2):
-        R = 3959
-        
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
-        
-        a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        return R * c
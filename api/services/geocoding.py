@@ -0,0 +1,30 @@
+from django.core.cache import cache
+from api.models import GeocodedLocation
+from .clients import geocode
+
+
+def canonical_location(location):
+    return ' '.join(location.lower().replace(',', ' ').split())
+
+
+def geocode_location(query):
+    key = canonical_location(query)
+    cache_key = f"geocode_{key.replace(' ', '_')}"
+    coords = cache.get(cache_key)
+    if coords:
+        return coords
+    
+    coords = GeocodedLocation.objects.filter(query=key).values_list('latitude', 'longitude').first()
+    if coords is None:
+        result = geocode(query, timeout=15)
+        if not result:
+            return None
+        
+        coords = (result.latitude, result.longitude)
+        GeocodedLocation.objects.get_or_create(
+            query=key,
+            defaults={'latitude': coords[0], 'longitude': coords[1]}
+        )
+    
+    cache.set(cache_key, coords, 86400)
+    return coords
@@ -1,5 +1,3 @@
-import folium
-import polyline as polyline_lib
 import os
 from django.conf import settings
 from decouple import config
@@ -12,6 +10,8 @@ class MapGenerator:
         if not route_data['coordinates']:
             return None
         
+        import folium
+        
         center_lat = sum(c[0] for c in route_data['coordinates']) / len(route_data['coordinates'])
         center_lng = sum(c[1] for c in route_data['coordinates']) / len(route_data['coordinates'])
         
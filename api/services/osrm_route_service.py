@@ -1,17 +1,27 @@
-import requests
 from django.core.cache import cache
-import polyline
+from decouple import config
+from api.models import CachedRoute
+from .clients import get_http_session
+from .geocoding import canonical_location, geocode_location
 
 
 class OSRMRouteService:
-    BASE_URL = "http://router.project-osrm.org/route/v1/driving"
+    BASE_URL = config('OSRM_BASE_URL', default="http://router.project-osrm.org/route/v1/driving")
     
     def get_route(self, start_location, end_location):
-        cache_key = f"route_{start_location.replace(' ', '_').replace(',', '')}_{end_location.replace(' ', '_').replace(',', '')}"
+        start_query = canonical_location(start_location)
+        end_query = canonical_location(end_location)
+        cache_key = f"route_{start_query}_{end_query}".replace(' ', '_')
         cached = cache.get(cache_key)
         if cached:
             return cached
         
+        stored = CachedRoute.objects.filter(start_query=start_query, end_query=end_query).first()
+        if stored:
+            route_data = self._decode_route(stored.polyline, stored.distance_miles, stored.duration_hours)
+            cache.set(cache_key, route_data, 3600)
+            return route_data
+        
         start_coords = self._geocode_location(start_location)
         end_coords = self._geocode_location(end_location)
         
@@ -22,38 +32,48 @@ class OSRMRouteService:
             'geometries': 'polyline'
         }
         
-        response = requests.get(url, params=params)
+        response = get_http_session().get(url, params=params, timeout=30)
         response.raise_for_status()
         
         data = response.json()
         route_data = self._parse_route(data)
         
+        CachedRoute.objects.get_or_create(
+            start_query=start_query,
+            end_query=end_query,
+            defaults={
+                'polyline': route_data['polyline'],
+                'distance_miles': route_data['distance_miles'],
+                'duration_hours': route_data['duration_hours']
+            }
+        )
         cache.set(cache_key, route_data, 3600)
         return route_data
     
     def _geocode_location(self, location):
-        from geopy.geocoders import Nominatim
-        geolocator = Nominatim(user_agent="fuel_optimizer", timeout=15)
-        result = geolocator.geocode(location + ", USA", timeout=15)
-        if not result:
+        coords = geocode_location(location + ", USA")
+        if not coords:
             raise ValueError(f"Could not geocode location: {location}")
-        return {'lat': result.latitude, 'lng': result.longitude}
+        return {'lat': coords[0], 'lng': coords[1]}
     
     def _parse_route(self, data):
         if data['code'] != 'Ok':
             raise ValueError(f"Routing failed: {data.get('message', 'Unknown error')}")
         
         route = data['routes'][0]
-        geometry = route['geometry']
-        
-        coords = polyline.decode(geometry)
         
-        distance_meters = route['distance']
-        duration_seconds = route['duration']
+        return self._decode_route(
+            route['geometry'],
+            route['distance'] * 0.000621371,
+            route['duration'] / 3600
+        )
+    
+    def _decode_route(self, geometry, distance_miles, duration_hours):
+        import polyline
         
         return {
-            'coordinates': coords,
-            'distance_miles': distance_meters * 0.000621371,
-            'duration_hours': duration_seconds / 3600,
+            'coordinates': polyline.decode(geometry),
+            'distance_miles': distance_miles,
+            'duration_hours': duration_hours,
             'polyline': geometry
         }
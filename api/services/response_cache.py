@@ -0,0 +1,54 @@
+import hashlib
+import json
+import zlib
+from django.conf import settings
+from django.core.cache import cache, caches
+from api.models import FuelDataVersion
+from .geocoding import canonical_location
+
+
+class ResponseCache:
+    CACHE_ALIAS = 'responses'
+    VERSION_CACHE_KEY = 'fuel_data_version'
+    VERSION_TTL = 60
+    
+    def __init__(self):
+        self.cache = caches[self.CACHE_ALIAS]
+        self.enabled = settings.RESPONSE_CACHE_ENABLED
+    
+    def get(self, key):
+        if not self.enabled:
+            return None
+        
+        payload = self.cache.get(key)
+        if payload is None:
+            return None
+        return json.loads(zlib.decompress(payload))
+    
+    def set(self, key, response_data):
+        if not self.enabled:
+            return
+        
+        payload = zlib.compress(json.dumps(response_data, separators=(',', ':')).encode('utf-8'))
+        self.cache.set(key, payload)
+    
+    @classmethod
+    def price_version(cls):
+        version = cache.get(cls.VERSION_CACHE_KEY)
+        if version is None:
+            version = FuelDataVersion.current()
+            cache.set(cls.VERSION_CACHE_KEY, version, cls.VERSION_TTL)
+        return version
+    
+    def key(self, start_location, end_location, vehicle_params):
+        # Build the key once per request: the price version it embeds must be the
+        # one read before routing, or a plan priced from old stations could be
+        # stored under a newer version.
+        parts = [
+            canonical_location(start_location),
+            canonical_location(end_location),
+            json.dumps(vehicle_params, sort_keys=True),
+            str(self.price_version()),
+        ]
+        digest = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+        return f"response_{digest}"
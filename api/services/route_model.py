@@ -0,0 +1,101 @@
+import numpy as np
+
+
+EARTH_RADIUS_MILES = 3959
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    lat1_rad = np.radians(lat1)
+    lat2_rad = np.radians(lat2)
+    delta_lat = np.radians(np.subtract(lat2, lat1))
+    delta_lon = np.radians(np.subtract(lon2, lon1))
+    
+    a = np.sin(delta_lat/2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(delta_lon/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    
+    return EARTH_RADIUS_MILES * c
+
+
+class RouteModel:
+    
+    def __init__(self, route_coords, distance_miles=None):
+        points = np.asarray(route_coords, dtype=float).reshape(-1, 2)
+        self.lats = points[:, 0]
+        self.lngs = points[:, 1]
+        
+        legs = haversine_miles(self.lats[:-1], self.lngs[:-1], self.lats[1:], self.lngs[1:])
+        self.cumulative_miles = np.concatenate(([0.0], np.cumsum(legs)))[:len(points)]
+        
+        # Scale the polyline length to the routed distance so mileages agree with OSRM.
+        if distance_miles and len(points) > 1 and self.cumulative_miles[-1] > 0:
+            self.cumulative_miles *= distance_miles / self.cumulative_miles[-1]
+        
+        self._station_locations = {}
+    
+    @property
+    def total_miles(self):
+        return float(self.cumulative_miles[-1]) if len(self.cumulative_miles) else 0.0
+    
+    def coordinate_at(self, miles):
+        if not len(self.lats):
+            raise ValueError("Route has no coordinates")
+        
+        miles = min(max(miles, 0.0), self.total_miles)
+        index = int(np.searchsorted(self.cumulative_miles, miles, side='right'))
+        if index >= len(self.lats):
+            return (float(self.lats[-1]), float(self.lngs[-1]))
+        
+        start_miles = self.cumulative_miles[index - 1]
+        span = self.cumulative_miles[index] - start_miles
+        fraction = (miles - start_miles) / span if span > 0 else 0.0
+        
+        lat = self.lats[index - 1] + fraction * (self.lats[index] - self.lats[index - 1])
+        lng = self.lngs[index - 1] + fraction * (self.lngs[index] - self.lngs[index - 1])
+        return (float(lat), float(lng))
+    
+    def locate(self, lat, lng, start_miles=None, end_miles=None):
+        if not len(self.lats):
+            return 0.0, float('inf')
+        
+        if len(self.lats) == 1:
+            return 0.0, float(haversine_miles(lat, lng, self.lats[0], self.lngs[0]))
+        
+        # Only project onto the segments covering [start_miles, end_miles]; binary
+        # search finds them, and an empty range falls back to the whole route.
+        first, last = 0, len(self.lats) - 1
+        if start_miles is not None:
+            first = max(int(np.searchsorted(self.cumulative_miles, start_miles, side='right')) - 1, 0)
+        if end_miles is not None:
+            last = min(int(np.searchsorted(self.cumulative_miles, end_miles, side='left')), len(self.lats) - 1)
+        if last <= first:
+            first, last = 0, len(self.lats) - 1
+        
+        lats = self.lats[first:last + 1]
+        lngs = self.lngs[first:last + 1]
+        
+        # Project onto each segment in a local equirectangular frame, then measure
+        # the real distance to the closest projection.
+        scale = np.cos(np.radians(lat))
+        start_x, start_y = lngs[:-1] * scale, lats[:-1]
+        delta_x, delta_y = lngs[1:] * scale - start_x, lats[1:] - start_y
+        length_sq = delta_x**2 + delta_y**2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = ((lng * scale - start_x) * delta_x + (lat - start_y) * delta_y) / length_sq
+        t = np.clip(np.nan_to_num(t), 0.0, 1.0)
+        
+        projected_lats = lats[:-1] + t * (lats[1:] - lats[:-1])
+        projected_lngs = lngs[:-1] + t * (lngs[1:] - lngs[:-1])
+        distances = haversine_miles(lat, lng, projected_lats, projected_lngs)
+        index = int(distances.argmin())
+        
+        segment_start = self.cumulative_miles[first + index]
+        segment_miles = self.cumulative_miles[first + index + 1] - segment_start
+        return float(segment_start + t[index] * segment_miles), float(distances[index])
+    
+    def locate_station(self, station, start_miles=None, end_miles=None):
+        key = (station.id, start_miles, end_miles)
+        location = self._station_locations.get(key)
+        if location is None:
+            location = self.locate(station.latitude, station.longitude, start_miles, end_miles)
+            self._station_locations[key] = location
+        return location
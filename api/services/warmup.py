@@ -0,0 +1,27 @@
+import logging
+from django.db import DatabaseError, connections
+from .clients import get_geolocator, get_http_session
+from .fuel_optimizer import FuelOptimizer
+from .response_cache import ResponseCache
+
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up_clients():
+    # Load numpy (via the route model) now rather than on the first request.
+    from . import route_model
+    get_geolocator()
+    get_http_session()
+
+
+def warm_up_caches():
+    try:
+        ResponseCache.price_version()
+        cities = FuelOptimizer.load_geocoded_cities()
+    except DatabaseError as e:
+        logger.warning("Skipping cache warm-up: %s", e)
+    else:
+        logger.info("Warm-up loaded %d geocoded cities", cities)
+    finally:
+        connections.close_all()
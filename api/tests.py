@@ -1,3 +1,370 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+import requests
+from django.core.management import call_command
+from django.core.cache import cache, caches
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from .loadtest.driver import LoadDriver, percentile
+from .loadtest.stubs import StubConfig, create_stub_server, synthesize_route
+from .models import FuelDataVersion, FuelStation
+from .services.fuel_optimizer import FuelOptimizer, NoReachableStationError
+from .services.response_cache import ResponseCache
+from .services.route_model import RouteModel, haversine_miles
 
-# Create your tests here.
+
+def straight_route(miles, points=200, lat=40.0, start_lng=-100.0):
+    # One degree of longitude at 40N is roughly 53 miles.
+    end_lng = start_lng + miles / 53.0
+    return [(lat, start_lng + (end_lng - start_lng) * i / (points - 1)) for i in range(points)]
+
+
+def create_station(opis_id, lat, lng, price):
+    return FuelStation.objects.create(
+        opis_truckstop_id=opis_id,
+        name=f'Station {opis_id}',
+        address='I-80',
+        city=f'City {opis_id}',
+        state='NE',
+        rack_id=1,
+        retail_price=price,
+        latitude=lat,
+        longitude=lng,
+        geocoded=True
+    )
+
+
+class FakeRouteService:
+    failing_locations = set()
+    calls = []
+    
+    def get_route(self, start_location, end_location):
+        FakeRouteService.calls.append(start_location)
+        if start_location in self.failing_locations:
+            raise requests.ConnectionError('upstream unavailable')
+        if start_location == 'Nowhere':
+            raise ValueError('Could not geocode location: Nowhere')
+        return {
+            'coordinates': straight_route(300),
+            'distance_miles': 300.0,
+            'duration_hours': 5.0,
+        }
+
+
+@mock.patch('api.services.osrm_route_service.OSRMRouteService', FakeRouteService)
+@mock.patch('api.management.commands.analyze_trip_log.RETRY_BACKOFF_SECONDS', 0)
+class AnalyzeTripLogTests(TestCase):
+
+    def setUp(self):
+        for i in range(6):
+            create_station(i + 1, 40.0, -100.0 + i, 3.00 + i / 10)
+        FakeRouteService.failing_locations = set()
+        FakeRouteService.calls = []
+        
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.log_path = os.path.join(self.tmp.name, 'trips.jsonl')
+        self.output_path = os.path.join(self.tmp.name, 'plans.csv')
+        with open(self.log_path, 'w', encoding='utf-8') as file:
+            for start in ['A', 'B', 'C', 'Nowhere', 'E']:
+                file.write(json.dumps({'start_location': start, 'end_location': 'Z'}) + '\n')
+    
+    def run_command(self):
+        call_command(
+            'analyze_trip_log', self.log_path,
+            output=self.output_path, workers=1, batch_size=2,
+            stdout=StringIO(), stderr=StringIO()
+        )
+    
+    def read_rows(self):
+        with open(self.output_path, newline='', encoding='utf-8') as file:
+            return list(csv.DictReader(file))
+    
+    def test_writes_one_row_per_trip_and_records_permanent_errors(self):
+        self.run_command()
+        
+        rows = self.read_rows()
+        self.assertEqual([row['line_number'] for row in rows], ['1', '2', '3', '4', '5'])
+        self.assertEqual(rows[3]['error'], 'Could not geocode location: Nowhere')
+        self.assertEqual(rows[0]['error'], '')
+        self.assertEqual(rows[0]['distance_miles'], '300.0')
+        self.assertFalse(os.path.exists(f'{self.output_path}.checkpoint'))
+    
+    def test_transient_failure_stops_before_the_line_and_resume_retries_it(self):
+        FakeRouteService.failing_locations = {'C'}
+        with self.assertRaises(CommandError):
+            self.run_command()
+        
+        self.assertEqual(FakeRouteService.calls.count('C'), 3)
+        self.assertEqual([row['line_number'] for row in self.read_rows()], ['1', '2'])
+        with open(f'{self.output_path}.checkpoint', encoding='utf-8') as file:
+            self.assertEqual(json.load(file)['processed'], 2)
+        
+        FakeRouteService.failing_locations = set()
+        FakeRouteService.calls = []
+        self.run_command()
+        
+        self.assertEqual(FakeRouteService.calls, ['C', 'Nowhere', 'E'])
+        self.assertEqual([row['line_number'] for row in self.read_rows()], ['1', '2', '3', '4', '5'])
+    
+    def test_resume_truncates_rows_written_after_the_checkpoint(self):
+        self.run_command()
+        with open(self.output_path, 'rb') as file:
+            lines = file.read().split(b'\r\n')
+        offset = len(b'\r\n'.join(lines[:3])) + 2
+        with open(self.output_path, 'ab') as file:
+            file.write(b'partial row')
+        with open(f'{self.output_path}.checkpoint', 'w', encoding='utf-8') as file:
+            json.dump({'log_path': os.path.abspath(self.log_path), 'processed': 2, 'output_offset': offset}, file)
+        
+        FakeRouteService.calls = []
+        self.run_command()
+        
+        self.assertEqual(FakeRouteService.calls, ['C', 'Nowhere', 'E'])
+        self.assertEqual([row['line_number'] for row in self.read_rows()], ['1', '2', '3', '4', '5'])
+
+
+class RouteModelTests(TestCase):
+    
+    def test_coordinate_at_follows_uneven_vertex_density(self):
+        dense = [(40.0, -100.0 + i / 530.0) for i in range(100)]
+        sparse = [(40.0, -100.0 + i / 5.3) for i in range(1, 11)]
+        route = RouteModel(dense + sparse)
+        
+        lat, lng = route.coordinate_at(55)
+        self.assertAlmostEqual(lat, 40.0)
+        self.assertAlmostEqual(lng, -100.0 + 55 / 52.93, places=2)
+    
+    def test_coordinate_at_clamps_to_route_ends(self):
+        route = RouteModel(straight_route(100), 100.0)
+        
+        self.assertEqual(route.coordinate_at(-10), (40.0, -100.0))
+        self.assertEqual(route.coordinate_at(500), route.coordinate_at(100))
+    
+    def test_locate_scales_to_routed_distance(self):
+        route = RouteModel(straight_route(100), 150.0)
+        
+        miles, distance = route.locate(40.1, -100.0 + 50 / 53.0)
+        self.assertAlmostEqual(miles, 75.0, delta=1.0)
+        self.assertAlmostEqual(distance, 6.9, delta=0.2)
+    
+    def test_windowed_locate_matches_full_scan(self):
+        route = RouteModel(straight_route(600), 600.0)
+        lat, lng = 40.05, -100.0 + 320 / 53.0
+        
+        self.assertEqual(route.locate(lat, lng, 250, 400), route.locate(lat, lng))
+        self.assertEqual(route.locate(lat, lng, 700, 800), route.locate(lat, lng))
+    
+    def test_empty_and_single_point_routes(self):
+        empty = RouteModel([])
+        self.assertEqual(empty.total_miles, 0.0)
+        self.assertEqual(empty.locate(40.0, -100.0), (0.0, float('inf')))
+        with self.assertRaises(ValueError):
+            empty.coordinate_at(0)
+        
+        single = RouteModel([(40.0, -100.0)], 10.0)
+        self.assertEqual(single.total_miles, 0.0)
+        self.assertEqual(single.coordinate_at(5), (40.0, -100.0))
+        miles, distance = single.locate(40.0, -99.0)
+        self.assertEqual(miles, 0.0)
+        self.assertAlmostEqual(distance, 52.93, delta=0.5)
+
+
+class OptimizeFuelStopsTests(TestCase):
+    
+    def plan(self, miles):
+        return FuelOptimizer().optimize_fuel_stops(straight_route(miles, points=500), float(miles))
+    
+    def test_legs_and_tank_stay_within_range(self):
+        for i in range(1, 20):
+            create_station(i, 40.0, -100.0 + i * 50 / 53.0, 3.00 + (i % 4) / 10)
+        
+        fuel_stops = self.plan(1000)
+        usable_range = FuelOptimizer.MAX_RANGE_MILES - FuelOptimizer.BUFFER_MILES
+        tank_gallons = FuelOptimizer.MAX_RANGE_MILES / FuelOptimizer.MPG
+        
+        previous_miles = 0.0
+        for stop in fuel_stops:
+            leg = stop['distance_from_start_miles'] - previous_miles
+            self.assertGreater(leg, 0)
+            self.assertLessEqual(leg, usable_range)
+            self.assertLessEqual(stop['gallons_needed'], tank_gallons)
+            previous_miles = stop['distance_from_start_miles']
+        
+        self.assertLessEqual(1000 - previous_miles, usable_range)
+        
+        # Every mile is fuelled exactly once: the starting tank to the first stop,
+        # then each purchase to the next stop or the destination.
+        totals = FuelOptimizer().trip_totals(fuel_stops)
+        purchased = sum(stop['gallons_needed'] for stop in fuel_stops)
+        self.assertAlmostEqual(purchased, (1000 - fuel_stops[0]['distance_from_start_miles']) / 10, delta=0.05)
+        self.assertAlmostEqual(totals['total_gallons'], 100.0, delta=0.05)
+    
+    def test_trip_totals_price_the_starting_tank_at_the_first_stop(self):
+        fuel_stops = [
+            {'distance_from_start_miles': 300.0, 'fuel_price_per_gallon': 3.0, 'gallons_needed': 40.0, 'fuel_cost': 120.0},
+            {'distance_from_start_miles': 700.0, 'fuel_price_per_gallon': 4.0, 'gallons_needed': 10.0, 'fuel_cost': 40.0},
+        ]
+        
+        self.assertEqual(FuelOptimizer().trip_totals(fuel_stops), {
+            'starting_tank_gallons': 30.0,
+            'total_gallons': 80.0,
+            'total_fuel_cost': 250.0
+        })
+        self.assertEqual(FuelOptimizer().trip_totals([])['total_gallons'], 0.0)
+    
+    def test_raises_when_no_station_is_reachable(self):
+        create_station(1, 40.0, -100.0 + 120 / 53.0, 3.00)
+        create_station(2, 40.0, -100.0 + 980 / 53.0, 3.00)
+        
+        with self.assertRaisesMessage(NoReachableStationError, 'No fuel station within range'):
+            self.plan(1059)
+
+
+@mock.patch('api.views.OSRMRouteService', FakeRouteService)
+@mock.patch('api.views.MapGenerator.generate_map', mock.Mock(return_value=None))
+class ResponseCacheTests(TestCase):
+    
+    def setUp(self):
+        for i in range(1, 6):
+            create_station(i, 40.0, -100.0 + i * 50 / 53.0, 3.00 + i / 10)
+        FakeRouteService.failing_locations = set()
+        FakeRouteService.calls = []
+        cache.clear()
+        caches[ResponseCache.CACHE_ALIAS].clear()
+        self.client = APIClient()
+    
+    def optimize(self, start_location='A'):
+        response = self.client.post(
+            '/api/route-optimizer/',
+            {'start_location': start_location, 'end_location': 'Z'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+    
+    def test_miss_then_hit(self):
+        first = self.optimize()
+        second = self.optimize('a ')
+        
+        self.assertFalse(first['performance']['cache_hit'])
+        self.assertEqual(first['performance']['external_api_calls'], 1)
+        self.assertTrue(second['performance']['cache_hit'])
+        self.assertEqual(second['performance']['external_api_calls'], 0)
+        self.assertEqual(second['fuel_stops'], first['fuel_stops'])
+        self.assertEqual(FakeRouteService.calls, ['A'])
+    
+    def test_price_version_bump_makes_old_entries_unreachable(self):
+        self.optimize()
+        FuelDataVersion.bump()
+        # Workers see the bump once their cached version expires.
+        cache.delete(ResponseCache.VERSION_CACHE_KEY)
+        
+        self.assertFalse(self.optimize()['performance']['cache_hit'])
+        self.assertEqual(FakeRouteService.calls, ['A', 'A'])
+    
+    def test_vehicle_params_are_part_of_the_key(self):
+        response_cache = ResponseCache()
+        params = {'max_range_miles': 500, 'mpg': 10, 'buffer_miles': 50}
+        
+        self.assertEqual(
+            response_cache.key('Dallas, TX', 'Tulsa, OK', params),
+            response_cache.key('dallas  tx', 'TULSA, OK', dict(params))
+        )
+        self.assertNotEqual(
+            response_cache.key('Dallas, TX', 'Tulsa, OK', params),
+            response_cache.key('Dallas, TX', 'Tulsa, OK', dict(params, mpg=8))
+        )
+    
+    def test_unreachable_plan_returns_422_and_is_not_cached(self):
+        FuelStation.objects.all().delete()
+        
+        for _ in range(2):
+            response = self.client.post(
+                '/api/route-optimizer/', {'start_location': 'A', 'end_location': 'Z'}, format='json'
+            )
+            self.assertEqual(response.status_code, 422)
+            self.assertIn('No fuel station within range', response.json()['error'])
+        self.assertEqual(FakeRouteService.calls, ['A', 'A'])
+    
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_disabled_cache_is_bypassed(self):
+        self.optimize()
+        
+        self.assertFalse(self.optimize()['performance']['cache_hit'])
+        self.assertEqual(FakeRouteService.calls, ['A', 'A'])
+
+
+class LoadTestHarnessTests(SimpleTestCase):
+    
+    def serve(self, stub_config):
+        server = create_stub_server('127.0.0.1', 0, stub_config)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f'http://127.0.0.1:{server.server_address[1]}'
+    
+    def test_percentile(self):
+        values = [10, 20, 30, 40, 50]
+        
+        self.assertEqual(percentile([], 0.5), 0.0)
+        self.assertEqual(percentile(values, 0.0), 10)
+        self.assertEqual(percentile(values, 0.5), 30)
+        self.assertEqual(percentile(values, 0.99), 50)
+        self.assertEqual(percentile(values, 1.0), 50)
+    
+    def test_synthesized_route_decodes_to_its_distance(self):
+        import polyline
+        
+        route = synthesize_route(40.0, -100.0, 41.0, -95.0)['routes'][0]
+        coords = polyline.decode(route['geometry'])
+        straight_miles = float(haversine_miles(40.0, -100.0, 41.0, -95.0))
+        
+        self.assertEqual(coords[0], (40.0, -100.0))
+        self.assertEqual(coords[-1], (41.0, -95.0))
+        self.assertAlmostEqual(route['distance'] * 0.000621371, straight_miles * 1.2, delta=0.01)
+        self.assertAlmostEqual(RouteModel(coords).total_miles, straight_miles, delta=1.0)
+    
+    def test_stub_replays_recordings_and_injects_errors(self):
+        recorded_route = {'code': 'Ok', 'routes': []}
+        recorded_place = [{'lat': '1.5', 'lon': '2.5', 'display_name': 'Somewhere'}]
+        url = self.serve(StubConfig(recordings={
+            'osrm': {'-100,40;-95,41': recorded_route},
+            'nominatim': {'Somewhere, USA': recorded_place},
+        }))
+        
+        self.assertEqual(requests.get(f'{url}/route/v1/driving/-100,40;-95,41').json(), recorded_route)
+        self.assertEqual(requests.get(f'{url}/search', params={'q': 'somewhere, usa'}).json(), recorded_place)
+        synthesized = requests.get(f'{url}/route/v1/driving/-100,40;-99,40', params={'overview': 'full'}).json()
+        self.assertEqual(synthesized['code'], 'Ok')
+        self.assertEqual(requests.get(f'{url}/unknown').status_code, 404)
+        
+        url = self.serve(StubConfig(error_rate=1.0))
+        self.assertEqual(requests.get(f'{url}/route/v1/driving/-100,40;-95,41').status_code, 503)
+    
+    def test_summarize_reports_error_and_cache_hit_rates(self):
+        results = [(0.1, True, True), (0.2, True, False), (0.3, True, True), (0.4, True, True), (5.0, False, False)]
+        
+        summary = LoadDriver('http://unused', [])._summarize(4, 0, 2.0, results, None)
+        self.assertEqual(summary['requests'], 5)
+        self.assertAlmostEqual(summary['error_rate'], 0.2)
+        self.assertAlmostEqual(summary['cache_hit_rate'], 0.75)
+        self.assertAlmostEqual(summary['throughput_rps'], 2.0)
+        self.assertAlmostEqual(summary['max_ms'], 400.0)
+        self.assertIsNone(summary['cpu_percent'])
+    
+    def test_run_step_closes_its_session(self):
+        url = self.serve(StubConfig())
+        driver = LoadDriver(f'{url}/unknown', [{'start_location': 'A', 'end_location': 'B'}], timeout=5)
+        
+        with mock.patch('requests.Session.close', autospec=True) as close:
+            summary = driver.run_step(1, 0, 0.05)
+        close.assert_called_once()
+        self.assertIsNone(driver.session)
+        self.assertEqual(summary['error_rate'], 1.0)
@@ -4,8 +4,9 @@ from rest_framework.response import Response
 from rest_framework import status
 from .serializers import RouteOptimizerRequestSerializer
 from .services.osrm_route_service import OSRMRouteService
-from .services.fuel_optimizer import FuelOptimizer
+from .services.fuel_optimizer import FuelOptimizer, NoReachableStationError
 from .services.map_generator import MapGenerator
+from .services.response_cache import ResponseCache
 
 
 class RouteOptimizerView(APIView):
@@ -21,6 +22,18 @@ class RouteOptimizerView(APIView):
         end_location = serializer.validated_data['end_location']
         
         try:
+            response_cache = ResponseCache()
+            vehicle_params = FuelOptimizer.vehicle_params()
+            cache_key = response_cache.key(start_location, end_location, vehicle_params)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                cached['performance'] = {
+                    'external_api_calls': 0,
+                    'cache_hit': True,
+                    'response_time_seconds': round(time.time() - start_time, 2)
+                }
+                return Response(cached, status=status.HTTP_200_OK)
+            
             route_service = OSRMRouteService()
             route_data = route_service.get_route(start_location, end_location)
             
@@ -30,8 +43,9 @@ class RouteOptimizerView(APIView):
                 route_data['distance_miles']
             )
             
-            total_fuel_cost = sum(stop['fuel_cost'] for stop in fuel_stops)
-            total_gallons = sum(stop['gallons_needed'] for stop in fuel_stops)
+            totals = optimizer.trip_totals(fuel_stops)
+            total_fuel_cost = totals['total_fuel_cost']
+            total_gallons = totals['total_gallons']
             avg_price = total_fuel_cost / total_gallons if total_gallons > 0 else 0
             
             map_gen = MapGenerator()
@@ -49,6 +63,7 @@ class RouteOptimizerView(APIView):
                 'fuel_stops': fuel_stops,
                 'summary': {
                     'total_fuel_stops': len(fuel_stops),
+                    'starting_tank_gallons': round(totals['starting_tank_gallons'], 2),
                     'total_gallons_needed': round(total_gallons, 2),
                     'total_fuel_cost': round(total_fuel_cost, 2),
                     'average_price_per_gallon': round(avg_price, 2)
@@ -56,12 +71,20 @@ class RouteOptimizerView(APIView):
                 'map_url': map_url,
                 'performance': {
                     'external_api_calls': 1,
+                    'cache_hit': False,
                     'response_time_seconds': round(response_time, 2)
                 }
             }
             
+            response_cache.set(cache_key, response_data)
+            
             return Response(response_data, status=status.HTTP_200_OK)
             
+        except NoReachableStationError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -132,10 +132,27 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Build long-lived clients and preload caches when the WSGI/ASGI application is
+# created, so workers start warm; management commands skip it.
+WARM_UP_WORKERS = config('WARM_UP_WORKERS', default=True, cast=bool)
+
+# Switches for A/B load tests: serve every request uncached, and open a fresh
+# connection per upstream call instead of reusing a pooled session.
+RESPONSE_CACHE_ENABLED = config('RESPONSE_CACHE_ENABLED', default=True, cast=bool)
+HTTP_POOLING_ENABLED = config('HTTP_POOLING_ENABLED', default=True, cast=bool)
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'fuel-optimizer-cache',
         'TIMEOUT': 3600,
-    }
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fuel-optimizer-responses',
+        'TIMEOUT': config('RESPONSE_CACHE_TIMEOUT', default=21600, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('RESPONSE_CACHE_MAX_ENTRIES', default=5000, cast=int),
+        },
+    },
 }
@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 
 import os
 
+from django.apps import apps
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fuel_optimizer.settings')
 
 application = get_wsgi_application()
+
+# Preload stations and caches before the worker starts serving requests.
+apps.get_app_config('api').warm_up()